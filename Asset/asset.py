@@ -1,13 +1,33 @@
 #!/usr/bin/env python3
 from argparse import ArgumentParser, FileType
+import copy
+import functools
+import os
 import sys
 import logging
 import logging.config
+import re
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 WARN_PERIOD_THRESHOLD = 5
 logger = logging.getLogger("asset")
+yaml_config_cache = {}
+ASSET_RE = re.compile(r"\s*(\S+)\s+(\S+)\s+(\S+)\s*$")
+
+
+@functools.lru_cache(maxsize=256)
+def parse_asset_str(raw: str) -> tuple:
+    match = ASSET_RE.match(raw)
+    if match is None:
+        raise ValueError(f"invalid asset string: {raw!r}")
+    name, capital, interest = match.groups()
+    return name, float(capital), float(interest)
 
 
 class Asset:
@@ -23,9 +43,7 @@ class Asset:
     @classmethod
     def build_from_str(cls, raw: str):
         logger.debug("building asset object...")
-        name, capital, interest = raw.strip().split()
-        capital = float(capital)
-        interest = float(interest)
+        name, capital, interest = parse_asset_str(raw)
         asset = cls(name=name, capital=capital, interest=interest)
         return asset
 
@@ -60,17 +78,30 @@ def print_asset_revenue(asset_fin, periods):
     if len(periods) >= WARN_PERIOD_THRESHOLD:
         logger.warning("too many periods were provided: %s", len(periods))
 
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    debug = logger.debug
+
     for period in periods:
         revenue = asset.calculate_revenue(period)
-        logger.debug("asset %s for period %s gives %s", asset, period, revenue)
+        if debug_enabled:
+            debug("asset %s for period %s gives %s", asset, period, revenue)
         print(f"{period:5}: {revenue:10.3f}")
 
 
+def load_yaml_config(config_fpath):
+    """load YAML config, parsed configs are cached by path and mtime"""
+    key = (config_fpath, os.stat(config_fpath).st_mtime_ns)
+    if key not in yaml_config_cache:
+        with open(config_fpath) as config_fin:
+            yaml_config_cache[key] = yaml.load(config_fin, Loader=YamlLoader)
+    return yaml_config_cache[key]
+
+
 def setup_logging(logging_yaml_config_fpath):
     """setup logging via YAML if it is provided"""
     if logging_yaml_config_fpath:
-        with open(logging_yaml_config_fpath) as config_fin:
-            logging.config.dictConfig(yaml.safe_load(config_fin))
+        config = load_yaml_config(logging_yaml_config_fpath)
+        logging.config.dictConfig(copy.deepcopy(config))
 
 
 def setup_parser(parser):
@@ -4,6 +4,9 @@ Tests for asset module
 
 from argparse import ArgumentParser, Namespace
 import logging
+import re
+
+import pytest
 
 from asset import Asset, load_asset_from_file, process_cli_arguments, \
     setup_logging, setup_parser
@@ -26,6 +29,16 @@ CMD_ARGS = [
     '5'
 ]
 
+# Fixtures
+
+@pytest.fixture
+def asset_file(tmp_path):
+    """Asset file with RAW_ASSET opened for reading"""
+    path = tmp_path / ASSET_PATH
+    path.write_text(RAW_ASSET)
+    with open(path, 'r') as fin:
+        yield fin
+
 # Base tests
 
 def test_setup_parser():
@@ -40,7 +53,7 @@ def test_setup_parser():
     assert parser.description == "tool to forecast asset revenue"
     assert parser.prog == "asset"
 
-def test_assert_magic_functions(tmp_path):
+def test_assert_magic_functions(asset_file):
     """Test asset magic functions"""
     true_asset = Asset(
         name='property',
@@ -54,12 +67,7 @@ def test_assert_magic_functions(tmp_path):
         interest=0.1,
     )
 
-    path = tmp_path / ASSET_PATH
-    with open(path, 'w') as fout:
-        fout.write(RAW_ASSET)
-
-    with open(path, 'r') as fin:
-        asset = load_asset_from_file(fin)
+    asset = load_asset_from_file(asset_file)
 
     assert true_asset == asset, (
         f"True asset: {true_asset}\nGot: {asset}\n"
@@ -84,13 +92,9 @@ def test_build_asset_from_string():
         f"True asset: {true_asset}\nGot: {asset}\n"
     )
 
-def test_build_asset_from_file(tmp_path):
+def test_build_asset_from_file(asset_file):
     """Test build asset from file"""
-    path = tmp_path / ASSET_PATH
-    with open(path, 'w') as fout:
-        fout.write(RAW_ASSET)
-    with open(path, 'r') as fin:
-        asset = load_asset_from_file(fin)
+    asset = load_asset_from_file(asset_file)
     true_asset = Asset(
         name='property',
         capital=1000.0,
@@ -102,13 +106,9 @@ def test_build_asset_from_file(tmp_path):
     )
 
 
-def test_load_asset_from_file(tmp_path):
+def test_load_asset_from_file(asset_file):
     """Test load asset from file"""
-    path = tmp_path / ASSET_PATH
-    with open(path, 'w') as fout:
-        fout.write(RAW_ASSET)
-    with open(path, 'r') as fin:
-        asset = load_asset_from_file(fin)
+    asset = load_asset_from_file(asset_file)
 
     true_asset = Asset(
         name='property',
@@ -127,31 +127,23 @@ def test_setup_logging():
         f"logger must have 3 handlers\nGot: {logger.handlers}"
     )
 
-def test_process_cli_arguments(capsys, tmp_path):
+def test_process_cli_arguments(capsys, asset_file):
     """Test main function"""
-    path = tmp_path / ASSET_PATH
-    with open(path, 'w') as fout:
-        fout.write(RAW_ASSET)
     arguments = Namespace(
-        asset_fin=open(path, 'r'),
+        asset_fin=asset_file,
         periods=[1, 2, 5],
     )
     true_result = '1:100.0002:210.0005:610.510'
     process_cli_arguments(arguments)
-    captured = capsys.readouterr().out
-    captured = captured.strip().split()
-    captured = ''.join([i.strip() for i in captured])
+    captured = re.sub(r'\s+', '', capsys.readouterr().out)
     assert true_result == captured
 
 # Logging tests
 
-def test_logging_debug_and_warn(tmp_path):
+def test_logging_debug_and_warn(asset_file):
     """Test logging"""
-    path = tmp_path / ASSET_PATH
-    with open(path, 'w') as fout:
-        fout.write(RAW_ASSET)
     arguments = Namespace(
-        asset_fin=open(path, 'r'),
+        asset_fin=asset_file,
         periods=[1, 2, 5, 7, 10, 11],
         logging_yaml_config_fpath=LOGGING_CONF_PATH,
     )
@@ -185,13 +177,10 @@ def test_logging_debug_and_warn(tmp_path):
 
 # Logging output tests
 
-def test_logging_stderr(capsys, tmp_path):
+def test_logging_stderr(capsys, asset_file):
     """Test logging to stderr"""
-    path = tmp_path / ASSET_PATH
-    with open(path, 'w') as fout:
-        fout.write(RAW_ASSET)
     arguments = Namespace(
-        asset_fin=open(path, 'r'),
+        asset_fin=asset_file,
         periods=[1, 2, 5, 7, 10, 11],
         logging_yaml_config_fpath=LOGGING_CONF_PATH,
     )
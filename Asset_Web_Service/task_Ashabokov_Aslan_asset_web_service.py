@@ -6,18 +6,49 @@ from argparse import ArgumentParser, FileType
 import sys
 import logging
 import logging.config
-from typing import Dict
-import json
-from collections import defaultdict
+import threading
+from typing import Dict, Optional, Tuple
+from operator import itemgetter
 
+import cachetools
+import numpy as np
+import orjson
 import requests
 import yaml
-from flask import Flask, jsonify, make_response, request
-from bs4 import BeautifulSoup
+from flask import Flask, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from lxml import html as lxml_html
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    '''
+    Flask JSON provider which serializes with orjson
+    '''
+
+    def dumps(self, obj, **kwargs) -> str:
+        '''Serialize obj to JSON string'''
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.bank = []
-app.asset_names = []
+app.asset_names = set()
+# struct of arrays view of the bank used by revenue calculation
+app.bank_char_codes = []
+app.bank_capital = []
+app.bank_interest = []
+app.bank_arrays = None
+# guards bank changes and arrays rebuild, requests are served from threads
+app.bank_lock = threading.Lock()
+app.bank_rub_cache = (None, None, None, None)
 
 CBR_DAILY_URL = "https://www.cbr.ru/eng/currency_base/daily/"
 CBR_KEY_INDICATORS_URL = "https://www.cbr.ru/eng/key-indicators/"
@@ -31,10 +62,18 @@ API_CALCULATE_REVENUE = "/api/asset/calculate_revenue"
 API_CLEANUP = "/api/asset/cleanup"
 
 REPORT_TAGS = ['RUB', 'USD', 'EUR', 'Au', 'Ag', 'Pt', 'Pd']
+KEY_INDICATOR_TABLE_XPATH = '//div[@class="key-indicator_table_wrapper"]'
+KEY_INDICATOR_CODE_XPATH = './td[1]//div[@class="col-md-3 offset-md-1 _subinfo"]'
 API_503_MESSAGE = "CBR service is unavailable"
 API_404_MESSAGE = "This route is not found"
+TEXT_HEADERS = {"Content-Type": "text/plain; charset=utf-8"}
+
+# thousands separators dropped by convert_to_float
+FLOAT_STRIP_TABLE = str.maketrans('', '', ' ,')
 
 WARN_PERIOD_THRESHOLD = 5
+CBR_CACHE_TTL = 60
+CBR_CHUNK_SIZE = 65536
 logger = logging.getLogger("asset")
 
 
@@ -42,6 +81,8 @@ class Asset:
     '''
     Asset class
     '''
+    __slots__ = ('name', 'capital', 'interest')
+
     def __init__(self, name: str, capital: float, interest: float):
         '''Create asset'''
         self.name = name
@@ -81,6 +122,7 @@ class Profile:
     '''
     Composite class with assets of different type
     '''
+    __slots__ = ('asset', 'char_code')
 
     def __init__(self, name: str, char_code: str, capital: float, interest: float) -> None:
         '''Create profile'''
@@ -108,14 +150,38 @@ class Profile:
 
 def convert_to_float(text: str) -> float:
     '''Convert string to float'''
-    if ' ' in text:
-        text = ''.join(text.split(' '))
-    if ',' in text:
-        text = ''.join(text.split(','))
-    res = float(text)
+    res = float(text.translate(FLOAT_STRIP_TABLE))
 
     return res
 
+def parse_cbr_currency_base_daily_tree(tree) -> Dict[str,float]:
+    '''Parse CBR daily currency base from lxml html tree'''
+    char_codes = {}
+    rows = tree.xpath('//tr')[1:]
+
+    for row in rows:
+        cells = row.xpath('./td')
+        name = cells[1].text_content()
+        unit = float(cells[2].text_content())
+        rate = float(cells[-1].text_content())
+        char_codes[name] = rate / unit
+
+    return char_codes
+
+def parse_cbr_key_indicators_tree(tree) -> Dict[str,float]:
+    '''Parse CBR indicators from lxml html tree'''
+    char_codes = {}
+    tables = tree.xpath(KEY_INDICATOR_TABLE_XPATH)
+    # tables[1] holds currencies, tables[2] holds precious metals
+    rows = tables[1].xpath('.//tr')[1:] + tables[2].xpath('.//tr')[1:]
+
+    for row in rows:
+        code = row.xpath(KEY_INDICATOR_CODE_XPATH)[0].text_content()
+        value = row.xpath('./td')[-1].text_content()
+        char_codes[code] = convert_to_float(value)
+
+    return char_codes
+
 def parse_cbr_currency_base_daily(html_data: str) -> Dict[str,float]:
     '''
     Parse CBR daily currency base html
@@ -123,18 +189,7 @@ def parse_cbr_currency_base_daily(html_data: str) -> Dict[str,float]:
     - content example: https://www.cbr.ru/eng/currency_base/daily/
     - dump example: github../cbr_currency_base_daily.html
     '''
-    char_codes = {}
-    parser = BeautifulSoup(html_data, "html.parser")
-    tags = parser.findAll("tr")[1:]
-
-    for tag in tags:
-        subtags = tag.findAll("td")
-        name = subtags[1].string
-        unit = float(subtags[2].string)
-        rate = float(subtags[-1].string)
-        char_codes[name] = rate / unit
-
-    return char_codes
+    return parse_cbr_currency_base_daily_tree(lxml_html.fromstring(html_data))
 
 def parse_cbr_key_indicators(html_data: str) -> Dict[str,float]:
     '''
@@ -143,67 +198,141 @@ def parse_cbr_key_indicators(html_data: str) -> Dict[str,float]:
     - content example: https://www.cbr.ru/eng/key-indicators/
     - dump example: github../cbr_key_indicators.html
     '''
-    char_codes = {}
-    parser = BeautifulSoup(html_data, "html.parser")
-    tags = parser.findAll('div', {'class': 'key-indicator_table_wrapper'})
-    currency_tags = tags[1].findAll('tr')[1:]
-    active_tags = tags[2].findAll('tr')[1:]
-
-    for tag in currency_tags:
-        subtags = tag.findAll('td')
-        code = subtags[0].findAll('div', {'class': 'col-md-3 offset-md-1 _subinfo'})
-        code = code[0].text
-        value = subtags[2].text
-        char_codes[code] = convert_to_float(value)
+    return parse_cbr_key_indicators_tree(lxml_html.fromstring(html_data))
 
-    for tag in active_tags:
-        tag_lst = tag.text.strip('\n').split('\n')
-        tag_lst = [i for i in tag_lst if len(i) > 0]
-        code = tag_lst[1]
-        value = tag_lst[-1]
-        char_codes[code] = convert_to_float(value)
+CBR_PARSERS = {
+    CBR_DAILY_URL: parse_cbr_currency_base_daily_tree,
+    CBR_KEY_INDICATORS_URL: parse_cbr_key_indicators_tree,
+}
 
-    return char_codes
+# CBR data
+
+cbr_cache = cachetools.TTLCache(maxsize=len(CBR_PARSERS), ttl=CBR_CACHE_TTL)
+
+# TTLCache isn't thread safe, and the app serves requests from threads
+@cachetools.cached(cache=cbr_cache, lock=threading.Lock())
+def load_cbr_data(url: str) -> Dict[str,float]:
+    '''
+    Load and parse CBR page, result is cached for CBR_CACHE_TTL seconds
+
+    Response body is streamed into lxml parser chunk by chunk
+    '''
+    html_parser = lxml_html.HTMLParser()
+
+    with requests.get(url, stream=True) as get_response:
+        for chunk in get_response.iter_content(CBR_CHUNK_SIZE):
+            html_parser.feed(chunk)
+
+    tree = html_parser.close()
+    parser = CBR_PARSERS[url]
+
+    return parser(tree)
+
+def get_cbr_daily_rates() -> Optional[Dict[str,float]]:
+    '''Get daily CBR rates, None if CBR is unavailable'''
+    try:
+        return load_cbr_data(CBR_DAILY_URL)
+    except requests.exceptions.ConnectionError:
+        return None
+
+def get_cbr_key_indicators() -> Optional[Dict[str,float]]:
+    '''Get key indicators from CBR website, None if CBR is unavailable'''
+    try:
+        return load_cbr_data(CBR_KEY_INDICATORS_URL)
+    except requests.exceptions.ConnectionError:
+        return None
+
+def get_rub_rate(
+        char_code: str,
+        cbr_daily_rates: Dict[str,float],
+        cbr_indicators: Dict[str,float],
+    ) -> float:
+    '''Get RUB rate for char_code, key indicators take precedence over daily rates'''
+    if char_code == "RUB":
+        return 1.0
+    if char_code in cbr_indicators:
+        return cbr_indicators[char_code]
+
+    return cbr_daily_rates[char_code]
+
+# Bank
+
+def get_bank_arrays():
+    '''
+    Get bank as arrays: (char_codes, char_code_index, capitals, interests)
+
+    - char_codes: unique char codes of the bank
+    - char_code_index: index in char_codes for every asset
+
+    Arrays are rebuilt on first use after the bank was changed, the returned
+    tuple is a snapshot, which isn't changed by later requests
+    '''
+    with app.bank_lock:
+        if app.bank_arrays is None:
+            char_codes, char_code_index = np.unique(app.bank_char_codes, return_inverse=True)
+            app.bank_arrays = (
+                char_codes.tolist(),
+                char_code_index,
+                np.array(app.bank_capital, dtype=float),
+                np.array(app.bank_interest, dtype=float),
+            )
+
+        return app.bank_arrays
+
+def get_bank_rub_capitals(
+        cbr_daily_rates: Dict[str,float],
+        cbr_indicators: Dict[str,float],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Get (capitals in RUB, interests) of one bank snapshot
+
+    RUB capitals are reused while the same bank and CBR snapshots are passed
+    '''
+    bank_arrays = get_bank_arrays()
+    char_codes, char_code_index, capitals, interests = bank_arrays
+    cached_arrays, cached_rates, cached_indicators, rub_capitals = app.bank_rub_cache
+
+    if cached_arrays is not bank_arrays or cached_rates is not cbr_daily_rates \
+            or cached_indicators is not cbr_indicators:
+        rates = np.array(
+            [get_rub_rate(code, cbr_daily_rates, cbr_indicators) for code in char_codes],
+            dtype=float,
+        )
+        rub_capitals = capitals * rates[char_code_index]
+        app.bank_rub_cache = (bank_arrays, cbr_daily_rates, cbr_indicators, rub_capitals)
+
+    return rub_capitals, interests
 
 # API
 
 def error_503_handler():
     '''Connection Error Handler'''
-    response = make_response(API_503_MESSAGE, 503)
-    response.mimetype = "text/plain"
-
-    return response
+    return API_503_MESSAGE, 503, TEXT_HEADERS
 
 @app.errorhandler(404)
 def not_found_callback(error):
     '''Page not found 404 callback'''
     logger.error(str(error))
-    response = make_response(API_404_MESSAGE, 404)
-    response.mimetype = "text/plain"
 
-    return response
+    return API_404_MESSAGE, 404, TEXT_HEADERS
 
 @app.route(API_CBR_DAILY)
 def cbr_daily_callback():
     '''Get daily CBR rates'''
-    try:
-        get_response = requests.get(CBR_DAILY_URL)
-    except requests.exceptions.ConnectionError:
-        return error_503_handler()
+    char_dict = get_cbr_daily_rates()
 
-    char_dict = parse_cbr_currency_base_daily(get_response.text)
+    if char_dict is None:
+        return error_503_handler()
 
     return jsonify(char_dict)
 
 @app.route(API_CBR_KEY_INDICATORS)
 def cbr_indicators_callback():
     '''Get indicators from CBR website'''
-    try:
-        get_response = requests.get(CBR_KEY_INDICATORS_URL)
-    except requests.exceptions.ConnectionError:
-        return error_503_handler()
+    char_dict = get_cbr_key_indicators()
 
-    char_dict = parse_cbr_key_indicators(get_response.text)
+    if char_dict is None:
+        return error_503_handler()
 
     return jsonify(char_dict)
 
@@ -220,33 +349,29 @@ def create_asset_callback(char_code: str, name: str, capital: str, interest: str
     - interest: str
 
     Return
-    - response: flask.Response
+    - response: (body, status, headers) tuple
     '''
 
     capital = float(capital)
     interest = float(interest)
 
-    profile = Profile(
-        name=name,
-        char_code=char_code,
-        capital=capital,
-        interest=interest,
-    )
-
-    if name in app.asset_names:
-        response = make_response(
-            f"Asset {name} already exists",
-            403,
-        )
-        response.mimetype = "text/plane"
-    else:
-        app.bank.append(profile)
-        app.asset_names.append(name)
-        response = make_response(
-            f"Asset {name} was successfully added",
-            200,
-        )
-        response.mimetype = "text/plane"
+    with app.bank_lock:
+        if name in app.asset_names:
+            response = f"Asset {name} already exists", 403, TEXT_HEADERS
+        else:
+            profile = Profile(
+                name=name,
+                char_code=char_code,
+                capital=capital,
+                interest=interest,
+            )
+            app.bank.append(profile)
+            app.asset_names.add(name)
+            app.bank_char_codes.append(char_code)
+            app.bank_capital.append(capital)
+            app.bank_interest.append(interest)
+            app.bank_arrays = None
+            response = f"Asset {name} was successfully added", 200, TEXT_HEADERS
 
     return response
 
@@ -257,7 +382,7 @@ def get_asset_list_callback():
     for asset in app.bank:
         all_assets.append(asset.get_asset())
 
-    all_assets = sorted(all_assets)
+    all_assets.sort(key=itemgetter(0, 1))
     response = jsonify(all_assets)
 
     return response
@@ -272,7 +397,7 @@ def get_asset_callback():
         if asset.asset.name in query:
             all_assets.append(asset.get_asset())
 
-    all_assets = sorted(all_assets)
+    all_assets.sort(key=itemgetter(0, 1))
     response = jsonify(all_assets)
 
     return response
@@ -281,36 +406,19 @@ def get_asset_callback():
 def calculate_revenue_callback():
     '''Calculate revenue with given periods'''
     query = request.args.getlist('period')
-    cbr_daily_rates = cbr_daily_callback().get_data()
-    cbr_daily_rates = json.loads(cbr_daily_rates)
-    cbr_indicators = cbr_indicators_callback().get_data()
-    cbr_indicators = json.loads(cbr_indicators)
-    all_revenue = defaultdict(lambda: 0)
-
-    for period in query:
-        current_revenue = 0
+    cbr_daily_rates = get_cbr_daily_rates()
+    cbr_indicators = get_cbr_key_indicators()
 
-        for profile in app.bank:
-            current_char_code = profile.char_code
-            current_asset = profile.asset
-
-            if current_char_code != "RUB":
-                if current_char_code in cbr_indicators:
-                    current_capital = current_asset.capital * \
-                        cbr_indicators[current_char_code]
-                else:
-                    current_capital = current_asset.capital * \
-                        cbr_daily_rates[current_char_code]
-
-                current_asset = Asset(
-                    name=current_asset.name,
-                    capital=current_capital,
-                    interest=current_asset.interest,
-                )
+    if cbr_daily_rates is None or cbr_indicators is None:
+        return error_503_handler()
 
-            current_revenue += current_asset.calculate_revenue(float(period))
+    capitals, interests = get_bank_rub_capitals(cbr_daily_rates, cbr_indicators)
+    periods = np.asarray(query, dtype=float)
 
-        all_revenue[period] += current_revenue
+    # rows are periods, columns are assets
+    revenue = capitals[None, :] * \
+        ((1.0 + interests)[None, :] ** periods[:, None] - 1.0)
+    all_revenue = dict(zip(query, revenue.sum(axis=1).tolist()))
 
     response = jsonify(all_revenue)
 
@@ -319,12 +427,17 @@ def calculate_revenue_callback():
 @app.route(API_CLEANUP)
 def cleanup_callback():
     '''Delete all assets'''
-    app.bank = []
-    app.asset_names = []
+    with app.bank_lock:
+        app.bank = []
+        app.asset_names = set()
+        app.bank_char_codes = []
+        app.bank_capital = []
+        app.bank_interest = []
+        app.bank_arrays = None
+        app.bank_rub_cache = (None, None, None, None)
     msg = "there are no more assets"
-    response = make_response(msg, 200)
 
-    return response
+    return msg, 200
 
 # Functions
 
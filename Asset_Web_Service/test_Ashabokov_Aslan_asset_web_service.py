@@ -2,16 +2,22 @@
 Test task_Ashabokov_Aslan_asset_web_service module
 '''
 from unittest import mock
-from argparse import ArgumentParser, Namespace
+from argparse import ArgumentParser
 import json
+import threading
 
+import numpy as np
 import requests
 import pytest
 
 from task_Ashabokov_Aslan_asset_web_service import (
     Asset,
     app,
+    cbr_cache,
+    CBR_DAILY_URL,
+    CBR_KEY_INDICATORS_URL,
     load_asset_from_file,
+    get_bank_arrays,
     print_asset_revenue,
     setup_parser,
     parse_cbr_currency_base_daily,
@@ -24,6 +30,7 @@ from task_Ashabokov_Aslan_asset_web_service import (
     API_GET_ASSET,
     API_CALCULATE_REVENUE,
     API_CLEANUP,
+    REPORT_TAGS,
 )
 
 
@@ -35,12 +42,26 @@ CBR_DAILY_HTML = "cbr_currency_base_daily.html"
 CBR_KEY_INDICATORS_HTML = "cbr_key_indicators.html"
 API_UNKNOWN_ROUTE = "abc/gg/wp"
 
-def test_parse_cbr_currency_base_daily():
-    '''Test parse_cbr_currency_base_daily'''
+@pytest.fixture(scope="session")
+def cbr_daily_html():
+    '''Get CBR daily currency base html dump'''
     with open(CBR_DAILY_HTML) as fin:
-        html_dump = fin.read()
+        return fin.read()
+
+@pytest.fixture(scope="session")
+def cbr_key_indicators_html():
+    '''Get CBR key indicators html dump'''
+    with open(CBR_KEY_INDICATORS_HTML) as fin:
+        return fin.read()
 
-    result_dict = parse_cbr_currency_base_daily(html_dump)
+@pytest.fixture(scope="session")
+def cbr_key_indicators(cbr_key_indicators_html):
+    '''Get parsed CBR key indicators html dump'''
+    return parse_cbr_key_indicators(cbr_key_indicators_html)
+
+def test_parse_cbr_currency_base_daily(cbr_daily_html):
+    '''Test parse_cbr_currency_base_daily'''
+    result_dict = parse_cbr_currency_base_daily(cbr_daily_html)
     aud_rate = result_dict['AUD']
     amd_rate = result_dict['AMD']
 
@@ -54,36 +75,50 @@ def test_parse_cbr_currency_base_daily():
         f"AMD value should be: {14.4485 / 100}.\nGot: {amd_rate}"
     )
 
-def test_parse_cbr_key_indicators():
+@pytest.mark.parametrize("tag", [tag for tag in REPORT_TAGS if tag != "RUB"])
+def test_parse_cbr_key_indicators(cbr_key_indicators, tag):
     '''Test parse_cbr_key_indicators'''
-    with open(CBR_KEY_INDICATORS_HTML) as fin:
-        html_dump = fin.read()
+    assert tag in cbr_key_indicators, (
+        f"{tag} should be parsed.\nGot: {list(cbr_key_indicators)}"
+    )
+    assert isinstance(cbr_key_indicators[tag], float), (
+        f"Value should type of float.\nGot: {type(cbr_key_indicators[tag])}"
+    )
 
-    result_dict = parse_cbr_key_indicators(html_dump)
+# API tests
 
-    for tag in result_dict:
-        assert isinstance(result_dict[tag], float), (
-            f"Value should type of float.\nGot: {type(result_dict[tag])}"
-        )
+def create_cbr_response(html_dump: str) -> requests.Response:
+    '''Create streamable requests.Response with html_dump as body'''
+    response = requests.Response()
+    response.status_code = 200
+    response.encoding = "utf-8"
+    response._content = html_dump.encode(response.encoding)
+    response._content_consumed = True
 
-# API tests
+    return response
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def client():
     '''Get flask client fixture'''
     with app.test_client() as client:
         yield client
 
+@pytest.fixture(autouse=True)
+def cleanup_bank(client):
+    '''Start every test with an empty bank'''
+    client.get(API_CLEANUP)
+    yield
+
+@pytest.fixture(autouse=True)
+def clear_cbr_cache():
+    '''Drop cached CBR pages so every test sees its own (mocked) response'''
+    cbr_cache.clear()
+    yield
+
 @mock.patch("requests.get")
-def test_local_cbr_daily_callback(mock_get, client):
+def test_local_cbr_daily_callback(mock_get, client, cbr_daily_html):
     '''Test local cbr_daily_callback'''
-    with open(CBR_DAILY_HTML) as fin:
-        html_dump = fin.read()
-    response = Namespace()
-    response.status_code = 200
-    response.text = html_dump
-    response.ok = True
-    mock_get.return_value = response
+    mock_get.return_value = create_cbr_response(cbr_daily_html)
     client_response = client.get(API_CBR_DAILY)
 
     assert client_response.status_code == 200, (
@@ -110,15 +145,9 @@ def test_cbr_daily_callback(client):
     )
 
 @mock.patch("requests.get")
-def test_local_cbr_indicators_callback(mock_get, client):
+def test_local_cbr_indicators_callback(mock_get, client, cbr_key_indicators_html):
     '''Test local cbr_indicators_callback'''
-    with open(CBR_KEY_INDICATORS_HTML) as fin:
-        html_dump = fin.read()
-    response = Namespace()
-    response.status_code = 200
-    response.text = html_dump
-    response.ok = True
-    mock_get.return_value = response
+    mock_get.return_value = create_cbr_response(cbr_key_indicators_html)
     client_response = client.get(API_CBR_KEY_INDICATORS)
 
     assert client_response.status_code == 200, (
@@ -153,7 +182,7 @@ def test_page_not_found(client):
 def test_page_is_not_accessable(mock_get, client):
     '''Test error 503'''
 
-    def lambda_function(x):
+    def lambda_function(*args, **kwargs):
         raise requests.exceptions.ConnectionError()
 
     true_state_code = 503
@@ -167,6 +196,19 @@ def test_page_is_not_accessable(mock_get, client):
         f"Response message should be: {API_503_MESSAGE}.\nGot: {response.get_data().decode()}"
     )
 
+@mock.patch("requests.get")
+def test_calculate_revenue_cbr_is_not_accessable(mock_get, client):
+    '''Test error 503 on revenue calculation'''
+    mock_get.side_effect = requests.exceptions.ConnectionError()
+    response = client.get(API_CALCULATE_REVENUE + "?period=1")
+
+    assert response.status_code == 503, (
+        f"Status code should be 503.\nGot: {response.status_code}"
+    )
+    assert API_503_MESSAGE == response.get_data().decode(), (
+        f"Response message should be: {API_503_MESSAGE}.\nGot: {response.get_data().decode()}"
+    )
+
 def create_test_asset_url(
         name: str = None,
         char_code: str = None,
@@ -269,20 +311,21 @@ def test_get_asset_list_callback(client):
 
     res_lst = json.loads(response.get_data())
 
-    assert len(res_lst) == 3, (
+    assert len(res_lst) == 2, (
         f"Response len must be 2.\nGot: {len(res_lst)}"
     )
-    assert first_asset_name == res_lst[1][1], (
+    assert first_asset_name == res_lst[0][1], (
         f"Asset {first_asset_name} must be first.\nGot: {res_lst}"
     )
 
 def test_get_asset_callback(client):
     '''Test get_asset_callback'''
+    for name in ["MyAsset1", "MyAsset2", "MyAsset3"]:
+        client.get(create_test_asset_url(name))
+
     request_url = create_test_asset_get_url()
     response = client.get(request_url)
 
-    # from pdb import set_trace; set_trace();
-
     assert response.status_code == 200, (
         "Status code must be 200."
     )
@@ -319,104 +362,112 @@ def test_cleanup_callback(client):
         f"Must return empty list.\nGot: {res_lst}"
     )
 
-def test_calculate_revenue_callback(client):
-    '''Test calculate_revenue_callback'''
-    revenue_request_url = create_test_revenue_request_url(
-        [1]
-    )
-    add_first_asset_url = create_test_asset_url(
-        name="T1",
-        char_code="RUB",
-        capital=100,
-        interest=0.1,
-    )
-    add_second_asset_url = create_test_asset_url(
-        name="T2",
-        char_code="RUB",
-        capital=100,
-        interest=0.1,
-    )
-
-    response = client.get(add_first_asset_url)
-
-    assert response.status_code == 200, (
-        f"Status code must be 200,\nGot: {response.status_code}"
-    )
-
-    response = client.get(add_second_asset_url)
-
-    assert response.status_code == 200, (
-        f"Status code must be 200,\nGot: {response.status_code}"
-    )
-
-    response = client.get(revenue_request_url)
-
-    assert response.status_code == 200, (
-        f"Response status code must be 200.\nGot: {response.status_code}"
-    )
-
-    res_dict = json.loads(response.get_data())
-    expected_revenue = 20.000000000000018
-
-    assert abs(res_dict["1"] - expected_revenue) < EPS, (
-        f"Expected revenue: {expected_revenue}.\nGot: {res_dict['1']}"
-    )
-
-    add_asset_url = create_test_asset_url(
-        name="T3",
-        char_code="USD",
-        capital=100,
-        interest=0.1,
-    )
-    response = client.get(add_asset_url)
-
-    assert response.status_code == 200, (
-        f"Response status code must be 200.\nGot: {response.status_code}"
-    )
-
-    add_asset_url = create_test_asset_url(
-        name="T4",
-        char_code="AMD",
-        capital=10,
-        interest=0.1,
-    )
-    response = client.get(add_asset_url)
-
-    assert response.status_code == 200, (
-        f"Response status code must be 200.\nGot: {response.status_code}"
-    )
-
-    add_asset_url = create_test_asset_url(
-        name="T5",
-        char_code="Au",
-        capital=50,
-        interest=0.1,
-    )
-    response = client.get(add_asset_url)
-
-    assert response.status_code == 200, (
-        f"Response status code must be 200.\nGot: {response.status_code}"
-    )
+def test_bank_arrays_snapshot_with_concurrent_add(client):
+    '''Test asset added while bank arrays are rebuilt doesn't break the snapshot'''
+    for name in ("T1", "T2"):
+        client.get(create_test_asset_url(name=name, char_code="RUB"))
+
+    adder = threading.Thread(
+        target=app.test_client().get,
+        args=(create_test_asset_url(name="T3", char_code="USD"),),
+    )
+    unique = np.unique
+
+    def unique_with_add(*args, **kwargs):
+        adder.start()
+        # add request waits for the bank, while the arrays are rebuilt
+        adder.join(0.1)
+        return unique(*args, **kwargs)
+
+    with mock.patch("task_Ashabokov_Aslan_asset_web_service.np.unique", unique_with_add):
+        _, char_code_index, capitals, interests = get_bank_arrays()
+
+    adder.join()
+
+    assert len(char_code_index) == len(capitals) == len(interests) == 2
+    assert len(get_bank_arrays()[2]) == 3
+
+REVENUE_ASSETS = [
+    ("T1", "RUB", 100, 0.1),
+    ("T2", "RUB", 100, 0.1),
+    ("T3", "USD", 100, 0.1),
+    ("T4", "AMD", 10, 0.1),
+    ("T5", "Au", 50, 0.1),
+]
+
+# revenue by period for the first N assets of REVENUE_ASSETS
+EXPECTED_REVENUE = {
+    2: {"1": 20.000000000000018},
+    5: {"1": 21805.34615400002, "2": 45791.22692340005},
+}
+EXPECTED_LOCAL_REVENUE = {
+    2: {"1": 20.000000000000018},
+    5: {"1": 21805.342485000023, "2": 45791.219218500046},
+}
+
+@pytest.fixture(scope="class")
+def seeded_assets(client, request):
+    '''
+    Add first request.param assets of REVENUE_ASSETS to the bank
+
+    Bank is seeded once per class and param, all tests of the class share it
+    '''
+    assets = REVENUE_ASSETS[:request.param]
+    client.get(API_CLEANUP)
+
+    for name, char_code, capital, interest in assets:
+        response = client.get(create_test_asset_url(name, char_code, capital, interest))
+
+        assert response.status_code == 200, (
+            f"Status code must be 200,\nGot: {response.status_code}"
+        )
 
-    revenue_request_url = create_test_revenue_request_url([1, 2])
-    response = client.get(revenue_request_url)
+    return assets
 
+def assert_revenue(response, expected_revenue: dict):
+    '''Check revenue response for every period of expected_revenue'''
     assert response.status_code == 200, (
         f"Response status code must be 200.\nGot: {response.status_code}"
     )
 
     res_dict = json.loads(response.get_data())
-    expected_revenue = 21805.34615400002
 
-    assert abs(res_dict["1"] - expected_revenue) < EPS, (
-        f"Expected revenue: {expected_revenue}.\nGot: {res_dict['1']}"
-    )
-
-    expected_revenue = 45791.22692340005
+    for period, revenue in expected_revenue.items():
+        assert abs(res_dict[period] - revenue) < EPS, (
+            f"Expected revenue: {revenue}.\nGot: {res_dict[period]}"
+        )
 
-    assert abs(res_dict["2"] - expected_revenue) < EPS, (
-        f"Expected revenue: {expected_revenue}.\nGot: {res_dict['2']}"
-    )
+@pytest.mark.parametrize("seeded_assets", sorted(EXPECTED_REVENUE), indirect=True)
+class TestCalculateRevenue:
+    '''calculate_revenue_callback tests over bank seeded by seeded_assets'''
+
+    @pytest.fixture(autouse=True)
+    def cleanup_bank(self):
+        '''Keep the seeded bank between tests (overrides module cleanup_bank)'''
+        yield
+
+    def test_calculate_revenue_callback(self, client, seeded_assets):
+        '''Test calculate_revenue_callback'''
+        expected_revenue = EXPECTED_REVENUE[len(seeded_assets)]
+        response = client.get(create_test_revenue_request_url(list(expected_revenue)))
+
+        assert_revenue(response, expected_revenue)
+
+    @mock.patch("requests.get")
+    def test_local_calculate_revenue_callback(
+            self, mock_get, client, seeded_assets,
+            cbr_daily_html, cbr_key_indicators_html,
+        ):
+        '''Test calculate_revenue_callback with CBR html dumps'''
+        html_dumps = {
+            CBR_DAILY_URL: cbr_daily_html,
+            CBR_KEY_INDICATORS_URL: cbr_key_indicators_html,
+        }
+        mock_get.side_effect = lambda url, **kwargs: create_cbr_response(html_dumps[url])
+        expected_revenue = EXPECTED_LOCAL_REVENUE[len(seeded_assets)]
+        response = client.get(create_test_revenue_request_url(list(expected_revenue)))
+
+        assert_revenue(response, expected_revenue)
 
 # Test Asset class
 
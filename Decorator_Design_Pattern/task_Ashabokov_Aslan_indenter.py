@@ -1,6 +1,7 @@
 '''
 Indenter context manager
 '''
+import sys
 from contextlib import ContextDecorator
 
 class Indenter(ContextDecorator):
@@ -11,14 +12,17 @@ class Indenter(ContextDecorator):
         self._indent_str = indent_str or (" " * 4)
         self._indent_level = indent_level or 0
         self._indent_level -= 1
+        self._prefixes = [self._indent_str * self._indent_level]
 
     def __enter__(self) -> None:
         self._indent_level += 1
+        self._prefixes.append(self._indent_str * self._indent_level)
         return self
 
     def __exit__(self, *args) -> None:
         self._indent_level -= 1
+        self._prefixes.pop()
 
     def print(self, print_str: str) -> None:
         '''Print print_str with indent string'''
-        print(self._indent_str * self._indent_level + print_str)
+        sys.stdout.write(self._prefixes[-1] + print_str + '\n')
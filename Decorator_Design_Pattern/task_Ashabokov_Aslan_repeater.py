@@ -25,12 +25,7 @@ def repeater(count: int) -> callable:
     def decorator(function: callable):
         @wraps(function)
         def wrapper(*args, **kwargs):
-            outcome = []
-
-            for _ in range(count):
-                outcome.append(function(*args, **kwargs))
-
-            return outcome
+            return [function(*args, **kwargs) for _ in range(count)]
         return wrapper
     return decorator
 
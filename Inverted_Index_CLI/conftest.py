@@ -1,6 +1,13 @@
 # see: https://docs.pytest.org/en/latest/example/simple.html#control-skipping-of-tests-according-to-command-line-option
+from copy import deepcopy
+
 import pytest
 
+from task_Ashabokov_Aslan_inverted_index import build_inverted_index, load_documents
+
+
+SAMPLE_DATASET_PATH = "sample.txt"
+
 
 def pytest_addoption(parser):
     try:
@@ -14,6 +21,7 @@ def pytest_addoption(parser):
 def pytest_configure(config):
     try:
         config.addinivalue_line("markers", "slow: mark test as slow to run")
+        config.addinivalue_line("markers", "xdist_group(name): run tests of group on one xdist worker")
     except:
         pass
 
@@ -26,4 +34,31 @@ def pytest_collection_modifyitems(config, items):
                 if "slow" in item.keywords:
                     item.add_marker(skip_slow)
     except:
-        pass
\ No newline at end of file
+        pass
+
+def assert_same_ids(actual, expected, message: str = ""):
+    """Assert two collections of document ids contain the same ids"""
+
+    assert sorted(actual) == sorted(expected), (
+        f"{message}expected ids: {sorted(expected)}\nGot: {sorted(actual)}\n"
+    )
+
+
+def postings_as_lists(data) -> dict:
+    """Convert postings arrays of index data to lists to compare with plain dicts"""
+
+    return {word: list(documents) for word, documents in data.items()}
+
+
+@pytest.fixture(scope="session")
+def sample_index():
+    """Inverted index of sample dataset, built once per session (don't change it)"""
+
+    return build_inverted_index(load_documents(SAMPLE_DATASET_PATH))
+
+
+@pytest.fixture
+def sample_index_copy(sample_index):
+    """Copy of sample_index for tests, which change the index"""
+
+    return deepcopy(sample_index)
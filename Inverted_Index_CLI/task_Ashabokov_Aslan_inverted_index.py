@@ -86,17 +86,147 @@ from __future__ import annotations, absolute_import
 import os
 import sys
 import json
+import functools
+import mmap
 import re
 import struct
+from array import array
 from itertools import chain
+from pathlib import Path
 from collections import defaultdict
-from typing import Dict, List
+from collections.abc import Mapping
+from typing import BinaryIO, Dict, List, Union
 from io import TextIOWrapper
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter, \
     FileType, Namespace
 
+import numpy as np
+
+try:
+    from orjson import dumps as orjson_dumps, loads as json_loads
+
+    def json_dumps(obj) -> bytes:
+        """Serialize obj to json, postings arrays are written as lists"""
+        return orjson_dumps(obj, default=list)
+except ImportError:
+    def json_dumps(obj) -> bytes:
+        """Fallback for orjson based json_dumps"""
+        return json.dumps(obj, default=list).encode()
+
+    def json_loads(data):
+        """Fallback for orjson.loads, which also takes memoryview"""
+        return json.loads(bytes(data))
+
 
 DEFAULT_OUTPUT_FILENAME = "inverted.index"
+QUERY_CACHE_SIZE = 1024
+QUERY_OUTPUT_BATCH_SIZE = 4096
+WORD_RE = re.compile(r"\w+")
+# postings are stored as arrays of signed 64-bit document indices
+POSTINGS_TYPECODE = "q"
+INT_TYPECODES = "bBhHiIlLqQ"
+
+
+def _bumps_version(method):
+    """Wrap container method to count changes made through it"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class Postings(array):
+    """Array of document indices, which counts its changes in version
+
+    Changes made through memoryview or numpy views of the array aren't counted
+    """
+
+    version = 0
+    # version, at which the order of documents was checked, and its result
+    _sorted_version = -1
+    _sorted = False
+
+    __setitem__ = _bumps_version(array.__setitem__)
+    __delitem__ = _bumps_version(array.__delitem__)
+    __iadd__ = _bumps_version(array.__iadd__)
+    __imul__ = _bumps_version(array.__imul__)
+    append = _bumps_version(array.append)
+    byteswap = _bumps_version(array.byteswap)
+    extend = _bumps_version(array.extend)
+    frombytes = _bumps_version(array.frombytes)
+    fromfile = _bumps_version(array.fromfile)
+    fromlist = _bumps_version(array.fromlist)
+    insert = _bumps_version(array.insert)
+    pop = _bumps_version(array.pop)
+    remove = _bumps_version(array.remove)
+    reverse = _bumps_version(array.reverse)
+
+    def is_sorted(self) -> bool:
+        """Whether documents are in ascending order, checked once per version"""
+
+        if self._sorted_version != self.version:
+            documents = np.asarray(self)
+            self._sorted = not (documents[1:] < documents[:-1]).any()
+            self._sorted_version = self.version
+
+        return self._sorted
+
+    def mark_sorted(self) -> None:
+        """Record documents are in ascending order, when caller knows it"""
+
+        self._sorted = True
+        self._sorted_version = self.version
+
+    def __copy__(self) -> "Postings":
+        """array copies lose the subclass"""
+
+        return type(self)(self.typecode, self)
+
+    def __deepcopy__(self, memo: dict) -> "Postings":
+        """Postings hold only ints, so deep copy is a copy"""
+
+        return self.__copy__()
+
+
+def new_postings(documents=()) -> Postings:
+    """Create postings array from documents indices"""
+
+    return Postings(POSTINGS_TYPECODE, documents)
+
+
+def postings_from_numpy(documents: np.ndarray) -> Postings:
+    """Create postings array from numpy array without boxing every document index"""
+
+    return new_postings(documents.astype(np.int64, copy=False).tobytes())
+
+
+class PostingsDict(defaultdict):
+    """defaultdict of postings arrays, which counts changes of its items in version
+
+    Changes of Postings in place are counted by Postings themselves
+    """
+
+    version = 0
+
+    __setitem__ = _bumps_version(defaultdict.__setitem__)
+    __delitem__ = _bumps_version(defaultdict.__delitem__)
+    clear = _bumps_version(defaultdict.clear)
+    pop = _bumps_version(defaultdict.pop)
+    popitem = _bumps_version(defaultdict.popitem)
+    setdefault = _bumps_version(defaultdict.setdefault)
+    update = _bumps_version(defaultdict.update)
+
+    # dict |= is new in python 3.9
+    if hasattr(defaultdict, "__ior__"):
+        __ior__ = _bumps_version(defaultdict.__ior__)
+
+    def __repr__(self) -> str:
+        """Print only the mapping (default factory repr has its address)"""
+
+        return dict.__repr__(self)
 
 
 class InvertedIndex:
@@ -119,12 +249,44 @@ class InvertedIndex:
         loads json from file
     """
 
-    def __init__(self, inverted_index_dict: Dict[int, str] = None) -> None:
-        """Create inverted index from dict (based on defaultdict)"""
+    def __init__(self, inverted_index_dict: Dict[int, str] = None, validate: bool = True) -> None:
+        """Create inverted index from dict (based on defaultdict of postings arrays)
+
+        validate=False skips dict_check for dicts built by this module itself,
+        PostingsDict is stored as is, without copying
+        """
+
+        if isinstance(inverted_index_dict, (LazyStructIndex, PostingsDict)):
+            if validate and isinstance(inverted_index_dict, PostingsDict):
+                self.dict_check(inverted_index_dict)
+
+            self.data_ = inverted_index_dict
+        else:
+            inverted_index_dict = inverted_index_dict or dict()
+
+            if validate:
+                self.dict_check(inverted_index_dict)
+
+            self.data_ = PostingsDict(new_postings, {
+                word: documents if isinstance(documents, Postings) else new_postings(documents)
+                for word, documents in inverted_index_dict.items()
+            })
+
+        self._cached_query = functools.lru_cache(maxsize=QUERY_CACHE_SIZE)(self._query)
 
-        inverted_index_dict = inverted_index_dict or dict()
-        self.dict_check(inverted_index_dict)
-        self.data_ = defaultdict(list, inverted_index_dict)
+    def __getstate__(self) -> dict:
+        """Query cache is bound to this object, so it isn't copied or pickled"""
+
+        state = self.__dict__.copy()
+        del state["_cached_query"]
+
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore object state with a fresh query cache"""
+
+        self.__dict__.update(state)
+        self._cached_query = functools.lru_cache(maxsize=QUERY_CACHE_SIZE)(self._query)
 
     def __eq__(self, other: InvertedIndex) -> bool:
         """Compares two InvertedIndex objects (true if they are equal)"""
@@ -134,17 +296,18 @@ class InvertedIndex:
                 f"InvertedIndex.__eq__() not implemented for objects type of {type(other)}"
             )
 
-        if set(self.data_.keys()) != set(other.data_.keys()):
+        if self.data_.keys() != other.data_.keys():
             return False
 
-        is_eq = True
-
+        # equal lists are the common case, sets are only needed for
+        # postings in different order or with repeats
         for key in self.data_:
-            if set(self.data_[key]) != set(other.data_[key]):
-                is_eq = False
-                break
+            documents, other_documents = self.data_[key], other.data_[key]
+
+            if documents != other_documents and set(documents) != set(other_documents):
+                return False
 
-        return is_eq
+        return True
 
     def __ne__(self, other: InvertedIndex) -> bool:
         """Compares two InvertedIndex objects (true if they are not equal)"""
@@ -176,6 +339,10 @@ class InvertedIndex:
 
             item_lst = input_dict[key]
 
+            # arrays of integer type can't hold anything but ints
+            if isinstance(item_lst, array) and item_lst.typecode in INT_TYPECODES:
+                continue
+
             if not isinstance(item_lst, list):
                 raise ValueError(f"dict values must be typeof {type(list)}\n\
                     Got: {type(item_lst)}")
@@ -200,39 +367,98 @@ class InvertedIndex:
         if len(self.data_) == 0 or len(words) == 0:
             return []
 
-        words = [word.lower().strip() for word in words]
-        result = set(self.data_[words[0]])
+        words = {word.lower().strip() for word in words}
+        postings = {word: self.data_.get(word) for word in words}
+        # data_ version and postings versions invalidate results after changes
+        key = frozenset(
+            (word, getattr(documents, "version", -1)) for word, documents in postings.items()
+        )
+
+        if all(documents is None or isinstance(documents, Postings) \
+                for documents in postings.values()):
+            return list(self._cached_query(key, self.data_.version))
 
-        for word in words:
-            result = result.intersection(set(self.data_[word]))
+        # changes of postings assigned as other types (e.g. list) aren't tracked
+        return list(self._query(key, self.data_.version))
+
+    def _query(self, key: frozenset, version: int) -> tuple:
+        """Intersects documents of the words from query key (cached in __init__)"""
+
+        postings = [self.data_.get(word) for word, _ in key]
+
+        if not all(postings):
+            return ()
+
+        # shortest postings first keep the intermediate results small
+        postings.sort(key=len)
+
+        return tuple(self._intersect_arrays(postings))
+
+    @staticmethod
+    def _sorted_documents(documents) -> np.ndarray:
+        """Documents as sorted numpy array, order of Postings is checked once per version"""
+
+        sorted_documents = np.asarray(documents, dtype=np.int64)
+
+        if isinstance(documents, Postings):
+            is_sorted = documents.is_sorted()
+        else:
+            is_sorted = not (sorted_documents[1:] < sorted_documents[:-1]).any()
+
+        return sorted_documents if is_sorted else np.sort(sorted_documents)
+
+    @classmethod
+    def _intersect_arrays(cls, postings: List[array]) -> List[int]:
+        """Intersects postings as sorted numpy arrays
+
+        Documents of the current result are binary searched in every next
+        (longer) postings, so sorted Postings are never scanned by merge
+        """
+
+        result = np.unique(np.asarray(postings[0], dtype=np.int64))
+
+        for documents in postings[1:]:
+            documents = cls._sorted_documents(documents)
+            positions = np.searchsorted(documents, result)
+            positions = np.minimum(positions, documents.size - 1)
+            result = result[documents[positions] == result]
+
+            if result.size == 0:
+                break
 
-        result = list(result)
+        return result.tolist()
 
-        return result
+    def dump(self, filepath: Union[str, os.PathLike, BinaryIO], method: str = 'json') -> None:
+        """Dumps self.data_ to filepath in json format (json also accepts binary file object)"""
 
-    def dump(self, filepath: str, method: str = 'json') -> None:
-        """Dumps self.data_ to filepath in json format"""
+        if isinstance(filepath, os.PathLike):
+            filepath = os.fspath(filepath)
 
-        filepath = str(filepath)
+        data = self.data_ if isinstance(self.data_, dict) else dict(self.data_)
 
         if method == 'json':
-            JsonPolicy.dump(self.data_, filepath)
+            JsonPolicy.dump(data, filepath)
         elif method == 'struct':
-            StructPolicy.dump(self.data_, filepath)
+            StructPolicy.dump(data, filepath)
         else:
             raise NotImplementedError(f"InvertedIndex.dump: not implemented\
                 for method={method}\n")
 
     @classmethod
-    def load(cls, filepath: str, method: str = 'json') -> InvertedIndex:
-        """Loads self.data_ from file in json format"""
+    def load(cls, filepath: Union[str, os.PathLike, BinaryIO], method: str = 'json', \
+            lazy: bool = False) -> InvertedIndex:
+        """Loads self.data_ from file in json format (json also accepts binary file object)
 
-        filepath = str(filepath)
+        lazy=True decodes struct index postings on demand (json is always loaded eagerly)
+        """
+
+        if isinstance(filepath, os.PathLike):
+            filepath = os.fspath(filepath)
 
         if method == 'json':
             inverted_index = JsonPolicy.load(filepath)
         elif method == 'struct':
-            inverted_index = StructPolicy.load(filepath)
+            inverted_index = StructPolicy.load(filepath, lazy=lazy)
         else:
             raise NotImplementedError(f"InvertedIndex.load: not implemented\
                 for method={method}\n")
@@ -249,7 +475,10 @@ def load_documents(filepath: str) -> Dict[int, str]:
         raise FileNotFoundError("load_documents: filepath doesn't exist\n")
 
     with open(filepath, 'r') as file:
-        lines = file.readlines()
+        lines = file.read().lower().split('\n')
+
+    if lines[-1] == '':
+        lines.pop()
 
     data_dict = {}
 
@@ -257,7 +486,7 @@ def load_documents(filepath: str) -> Dict[int, str]:
         if len(line) > 0 and '\t' not in line:
             raise ValueError("load_documents: got invalid data\n")
 
-        splited_line = line.lower().split('\t', maxsplit=1)
+        splited_line = line.split('\t', maxsplit=1)
 
         try:
             index = int(splited_line[0])
@@ -279,14 +508,24 @@ def build_inverted_index(documents: Dict[int, str]) -> InvertedIndex:
             raise ValueError(f"Document index must be int\nGot: {type(index)}")
         if not isinstance(documents[index], str):
             raise ValueError(f"Document item must be str\nGot: {type(documents[index])}\n")
-        item_lst = documents[index].strip()
-        item_lst = re.split(r"\W+", item_lst)
-        item_lst = [item.strip() for item in item_lst]
+        item_lst = dict.fromkeys(WORD_RE.findall(documents[index]))
 
         for word in item_lst:
             inverted_index_dict[word].append(index)
 
-    inverted_index = InvertedIndex(inverted_index_dict)
+    # lists append faster than arrays, postings are packed once at the end
+    inverted_index_dict = PostingsDict(new_postings, (
+        (word, new_postings(item_lst)) for word, item_lst in inverted_index_dict.items()
+    ))
+
+    # documents are appended in order, so ascending indices give sorted postings
+    indices = list(documents)
+
+    if all(index < next_index for index, next_index in zip(indices, indices[1:])):
+        for postings in inverted_index_dict.values():
+            postings.mark_sorted()
+
+    inverted_index = InvertedIndex(inverted_index_dict, validate=False)
 
     return inverted_index
 
@@ -319,28 +558,39 @@ class JsonPolicy(StoragePolicy):
     """
 
     @staticmethod
-    def dump(word_to_docs_mapping: dict, filepath: str):
-        """Save inverted index data on disk in json format"""
+    def dump(word_to_docs_mapping: dict, filepath: Union[str, os.PathLike, BinaryIO]):
+        """Save inverted index data on disk (or to binary file object) in json format"""
 
-        dirname = os.path.dirname(filepath)
+        is_file = hasattr(filepath, "write")
 
-        if not os.path.isdir(dirname) and not dirname == '':
-            raise FileNotFoundError(f"Dirpath {filepath} doesn't exist\n")
+        if not is_file:
+            dirname = os.path.dirname(filepath)
+
+            if not os.path.isdir(dirname) and not dirname == '':
+                raise FileNotFoundError(f"Dirpath {filepath} doesn't exist\n")
 
         InvertedIndex.dict_check(word_to_docs_mapping)
+        payload = json_dumps(word_to_docs_mapping)
 
-        with open(filepath, 'w') as file:
-            json.dump(word_to_docs_mapping, file)
+        if is_file:
+            filepath.write(payload)
+        else:
+            Path(filepath).write_bytes(payload)
 
     @staticmethod
-    def load(filepath: str):
-        """Load inverted index data from disk in json format"""
+    def load(filepath: Union[str, os.PathLike, BinaryIO]):
+        """Load inverted index data from disk (or from binary file object) in json format"""
 
-        if not os.path.exists(filepath):
+        if hasattr(filepath, "read"):
+            data_dict = json_loads(filepath.read())
+        elif not os.path.exists(filepath):
             raise FileNotFoundError(f"File {filepath} doesn't exist\n")
-
-        with open(filepath, 'r') as file:
-            data_dict = json.load(file)
+        else:
+            # parse straight from page cache instead of a copy of the file
+            with open(filepath, 'rb') as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer, \
+                    memoryview(buffer) as view:
+                data_dict = json_loads(view)
 
         return InvertedIndex(data_dict)
 
@@ -348,20 +598,79 @@ class JsonPolicy(StoragePolicy):
 class StructPolicy(StoragePolicy):
     """Class for saving inverted index data on disk in binary format using struct.
 
+    File layout (struct of arrays, big endian):
+    - format magic (MAGIC)
+    - number of words (int32)
+    - header: (word_offset, word_len, postings_offset, postings_size, postings_len)
+      per word (uint32), postings offset and size are in bytes
+    - words blob: utf-8 encoded words one after another
+    - postings blob: postings of all words one after another, each posting is
+      delta encoded, zigzag mapped and stored as varint (7 bits per byte,
+      high bit set on all bytes but the last)
+
     Functions
     ---------
     - dump  - dumps inverted index data on disk in binary format.
     - load  - loads inverted index data from disk in binary format.
+    - encode_postings  - encodes postings to varint blob.
+    - decode_postings  - decodes postings from varint blob.
     """
 
-    AS_INT = "i"
-    AS_SHORT = "H"
-    AS_CHAR = "s"
-    AS_BIG_ENDIAN = ">"
+    MAGIC = b"INVIDX\x00\x02"
+    COUNT_STRUCT = struct.Struct(">i")
+
+    HEADER_DTYPE = np.dtype([
+        ("word_offset", ">u4"),
+        ("word_len", ">u4"),
+        ("postings_offset", ">u4"),
+        ("postings_size", ">u4"),
+        ("postings_len", ">u4"),
+    ])
+    # smallest values which need 2, 3, ... 10 varint bytes
+    VARINT_LIMITS = np.array([1 << (7 * size) for size in range(1, 10)], dtype=np.uint64)
+
+    @classmethod
+    def encode_postings(cls, postings: np.ndarray, lens: np.ndarray) -> bytes:
+        """Encode concatenated postings of words with given lens to varint blob"""
+
+        starts = (np.cumsum(lens) - lens)[lens > 0]
+        deltas = np.diff(postings, prepend=0)
+        deltas[starts] = postings[starts]
+        zigzag = ((deltas << 1) ^ (deltas >> 63)).astype(np.uint64)
+
+        sizes = np.searchsorted(cls.VARINT_LIMITS, zigzag, side="right") + 1
+        byte_index = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        blob = (np.repeat(zigzag, sizes) >> (7 * byte_index).astype(np.uint64)) & 0x7F
+        blob |= np.where(byte_index < np.repeat(sizes - 1, sizes), 0x80, 0).astype(np.uint64)
+
+        return blob.astype(np.uint8).tobytes()
+
+    @staticmethod
+    def decode_postings(blob: bytes, lens: np.ndarray = None) -> np.ndarray:
+        """Decode concatenated postings of words with given lens from varint blob"""
+
+        data = np.frombuffer(blob, dtype=np.uint8)
+
+        if data.size == 0:
+            return np.empty(0, dtype=np.int64)
+
+        ends = np.flatnonzero(data < 0x80)
+        value_starts = np.concatenate(([0], ends[:-1] + 1))
+        byte_index = np.arange(data.size) - np.repeat(value_starts, ends - value_starts + 1)
+        zigzag = np.add.reduceat(
+            (data & 0x7F).astype(np.uint64) << (7 * byte_index).astype(np.uint64),
+            value_starts,
+        )
+        deltas = (zigzag >> 1).astype(np.int64) ^ -(zigzag & 1).astype(np.int64)
+        postings = np.cumsum(deltas)
 
-    INT_SIZE = struct.calcsize(">i")
-    SHORT_SIZE = struct.calcsize(">H")
-    CHAR_SIZE = struct.calcsize(">s")
+        if lens is not None:
+            # every word restarts its delta chain from zero
+            lens = lens[lens > 0]
+            starts = np.cumsum(lens) - lens
+            postings -= np.repeat(postings[starts] - deltas[starts], lens)
+
+        return postings
 
     @classmethod
     def dump(cls, word_to_docs_mapping: dict, filepath: str):
@@ -373,47 +682,162 @@ class StructPolicy(StoragePolicy):
 
         InvertedIndex.dict_check(word_to_docs_mapping)
 
+        length_of_dict = len(word_to_docs_mapping)
+        words = [word.encode() for word in word_to_docs_mapping]
+        postings = list(word_to_docs_mapping.values())
+        word_lens = np.fromiter(map(len, words), dtype=np.int64, count=length_of_dict)
+        postings_lens = np.fromiter(map(len, postings), dtype=np.int64, count=length_of_dict)
+
+        postings = np.fromiter(
+            chain.from_iterable(postings),
+            dtype=np.int64,
+            count=int(postings_lens.sum()),
+        )
+        postings_blob = cls.encode_postings(postings, postings_lens)
+        # byte end of every varint, then byte end of every word postings
+        value_ends = np.flatnonzero(np.frombuffer(postings_blob, dtype=np.uint8) < 0x80) + 1
+        postings_ends = np.concatenate(([0], value_ends))[np.cumsum(postings_lens)]
+
+        header = np.empty(length_of_dict, dtype=cls.HEADER_DTYPE)
+        header["word_offset"] = np.cumsum(word_lens) - word_lens
+        header["word_len"] = word_lens
+        header["postings_offset"] = np.concatenate(([0], postings_ends))[:-1]
+        header["postings_size"] = postings_ends - header["postings_offset"]
+        header["postings_len"] = postings_lens
+
+        payload = b"".join([
+            cls.MAGIC,
+            cls.COUNT_STRUCT.pack(length_of_dict),
+            header.tobytes(),
+            *words,
+            postings_blob,
+        ])
+
         with open(filepath, 'wb') as file:
-            length_of_dict = len(word_to_docs_mapping)
-            file.write(struct.pack(cls.AS_BIG_ENDIAN + cls.AS_INT, length_of_dict))
-            for word, indices in word_to_docs_mapping.items():
-                word = word.encode()
-                file.write(struct.pack(cls.AS_BIG_ENDIAN + cls.AS_SHORT, len(word)))
-                file.write(struct.pack(cls.AS_BIG_ENDIAN + str(len(word)) + cls.AS_CHAR, word))
-                file.write(struct.pack(cls.AS_BIG_ENDIAN + cls.AS_SHORT, len(indices)))
-                for index in indices:
-                    file.write(struct.pack(cls.AS_BIG_ENDIAN + cls.AS_INT, index))
+            file.write(payload)
+
+    @classmethod
+    def read_header(cls, buffer) -> tuple:
+        """Decode words and postings spans from binary inverted index data
+
+        Returns (words, spans, postings_offset), where spans are (offset, size, len)
+        of word postings in the postings blob starting at postings_offset
+        """
+
+        if buffer[:len(cls.MAGIC)] != cls.MAGIC:
+            raise ValueError("StructPolicy: unsupported binary index format\n")
+
+        count_offset = len(cls.MAGIC)
+        length_of_dict = cls.COUNT_STRUCT.unpack_from(buffer, count_offset)[0]
+        header = np.frombuffer(buffer, dtype=cls.HEADER_DTYPE, count=length_of_dict, \
+            offset=count_offset + cls.COUNT_STRUCT.size)
+        words_offset = count_offset + cls.COUNT_STRUCT.size + header.nbytes
+        words_blob = buffer[words_offset:words_offset + int(header["word_len"].sum())]
+        postings_offset = words_offset + len(words_blob)
+
+        words = [
+            words_blob[word_offset:word_offset + word_len].decode()
+            for word_offset, word_len in header[["word_offset", "word_len"]].tolist()
+        ]
+        spans = header[["postings_offset", "postings_size", "postings_len"]].tolist()
+
+        return words, spans, postings_offset
 
     @classmethod
-    def load(cls, filepath: str):
-        """Load inverted index data from disk in binary format"""
+    def load(cls, filepath: str, lazy: bool = False):
+        """Load inverted index data from disk in binary format
+
+        With lazy=True postings are decoded on first access (see LazyStructIndex)
+        """
 
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Dirpath {filepath} doesn't exist\n")
 
-        data_dict = defaultdict(list)
+        if lazy:
+            return InvertedIndex(LazyStructIndex(filepath), validate=False)
+
+        with open(filepath, 'rb') as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer, \
+                memoryview(buffer) as view:
+            words, spans, postings_offset = cls.read_header(buffer)
+            lens = np.array([index_len for _, _, index_len in spans], dtype=np.int64)
+            # decode postings blob in place, without copying it out of the map
+            postings = cls.decode_postings(view[postings_offset:], lens)
+
+        bounds = [0] + np.cumsum(lens).tolist()
+        data_dict = PostingsDict(new_postings, (
+            (word, postings_from_numpy(postings[start:end]))
+            for word, start, end in zip(words, bounds, bounds[1:])
+        ))
+
+        # order of all postings is checked at once, descents at word starts don't count
+        descents = np.flatnonzero(postings[1:] < postings[:-1]) + 1
+        unsorted_words = set(
+            np.searchsorted(bounds, descents[~np.isin(descents, bounds)], side='right') - 1
+        )
+
+        for word_index, documents in enumerate(data_dict.values()):
+            if word_index not in unsorted_words:
+                documents.mark_sorted()
+
+        return InvertedIndex(data_dict, validate=False)
+
+
+class LazyStructIndex(Mapping):
+    """Read-only inverted index mapping over memory-mapped binary index file.
+
+    Words and postings spans are decoded on open, postings of a word are
+    decoded on first access and memoized.
+
+    Functions
+    ---------
+    - close  - unmaps index file.
+    """
+
+    def __init__(self, filepath: str):
+        """Map index file and decode its header"""
 
         with open(filepath, 'rb') as file:
-            length_of_dict = struct.unpack(cls.AS_BIG_ENDIAN + cls.AS_INT, \
-                file.read(cls.INT_SIZE))[0]
-
-            for _ in range(length_of_dict):
-                word_len = struct.unpack(cls.AS_BIG_ENDIAN + cls.AS_SHORT, \
-                    file.read(cls.SHORT_SIZE))[0]
-                word = struct.unpack(cls.AS_BIG_ENDIAN + str(word_len) + cls.AS_CHAR, \
-                    file.read(word_len * cls.CHAR_SIZE))[0]
-                word = word.decode()
-                index_len = struct.unpack(cls.AS_BIG_ENDIAN + cls.AS_SHORT, \
-                    file.read(cls.SHORT_SIZE))[0]
-                indices = []
-
-                for _ in range(index_len):
-                    index = struct.unpack(cls.AS_BIG_ENDIAN + cls.AS_INT, \
-                        file.read(cls.INT_SIZE))[0]
-                    indices.append(index)
-                data_dict[word] = indices
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
 
-        return InvertedIndex(data_dict)
+        words, spans, self._postings_offset = StructPolicy.read_header(self._buffer)
+        self._spans = dict(zip(words, spans))
+        self._postings = {}
+
+    def __getitem__(self, word: str) -> Postings:
+        """Return documents of word, decoding them on first access"""
+
+        if word not in self._postings:
+            postings_offset, postings_size, _ = self._spans[word]
+            postings_offset += self._postings_offset
+            self._postings[word] = postings_from_numpy(StructPolicy.decode_postings(
+                self._buffer[postings_offset:postings_offset + postings_size]
+            ))
+
+        return self._postings[word]
+
+    def __iter__(self):
+        return iter(self._spans)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __contains__(self, word) -> bool:
+        return word in self._spans
+
+    def __repr__(self) -> str:
+        return f"LazyStructIndex: {len(self._spans)} words"
+
+    @property
+    def version(self) -> int:
+        """Index is read-only, so it never changes"""
+
+        return 0
+
+    def close(self):
+        """Unmap index file"""
+
+        self._buffer.close()
 
 
 class FileTypeWithEncodign(FileType):
@@ -451,13 +875,10 @@ class QueryInputIterator:
     def __init__(self, source):
         """Iterator init with paticular source"""
 
-        self.source = []
-
-        for query_list in source:
-            self.source = list(chain(self.source, query_list))
+        self.source = list(chain.from_iterable(source))
 
-    def __next__(self):
-        """Iterator next method"""
+    def __iter__(self):
+        """Iterator iter method: yields queries as lists of words"""
 
         for subquery in self.source:
             print(f"Current subquery: {subquery}", file=sys.stderr)
@@ -470,11 +891,6 @@ class QueryInputIterator:
                 subquery = subquery.strip().split()
                 yield subquery
 
-    def __iter__(self):
-        """Iterator iter method"""
-
-        return self.__next__()
-
 
 def callback_query(args: Namespace):
     """Query callback"""
@@ -486,15 +902,22 @@ def process_query(args: Namespace):
 
     print(f"Query process args: {args}", file=sys.stderr)
 
-    inverted_index = InvertedIndex.load(args.index, method=args.strategy)
+    inverted_index = InvertedIndex.load(args.index, method=args.strategy, lazy=True)
     iterator = QueryInputIterator(args.query_input)
 
     print(f"Loaded index: {inverted_index}", file=sys.stderr)
 
+    output_lines = []
+
     for query in iterator:
         document_ids = inverted_index.query(query)
-        document_ids = [str(ind) for ind in document_ids]
-        print(','.join(document_ids), file=sys.stdout)
+        output_lines.append(','.join(map(str, document_ids)) + '\n')
+
+        if len(output_lines) >= QUERY_OUTPUT_BATCH_SIZE:
+            sys.stdout.write(''.join(output_lines))
+            output_lines.clear()
+
+    sys.stdout.write(''.join(output_lines))
 
 def callback_build(args: Namespace):
     """Build callback"""
@@ -511,8 +934,9 @@ def process_build(args: Namespace):
     inverted_index.dump(args.output_filename, method=args.strategy)
 
 
+@functools.lru_cache(maxsize=1)
 def setup_parser() -> ArgumentParser:
-    """Create and setup command line arguments parser"""
+    """Create and setup command line arguments parser (built once, parse_args doesn't change it)"""
 
     parser = ArgumentParser(
         prog="inverted_index",
@@ -4,6 +4,7 @@ Tests for Inverted Index module
 """
 
 from collections import defaultdict
+from io import BytesIO
 import json
 from argparse import Namespace
 
@@ -13,8 +14,9 @@ from task_Ashabokov_Aslan_inverted_index import InvertedIndex, \
     StoragePolicy, JsonPolicy, load_documents, build_inverted_index, \
         callback_query, callback_build, setup_parser
 
+from conftest import assert_same_ids, postings_as_lists
+
 
-SAMPLE_DATASET_PATH = "sample.txt"
 SMALL_DATASET_PATH = "small_dataset.txt"
 TINY_DATASET_PATH = "tiny_dataset.txt"
 STRUCT_INDEX_PATH = "struct_inverted_index.txt"
@@ -164,8 +166,33 @@ def test_build_inverted_index_valid_input():
         f"result.data_ must be: {valid_output}\nGot: {result.data_}\n"
     )
 
+def test_build_inverted_index_skips_empty_words():
+    """Test build doesn't index empty words around punctuation"""
+
+    result = build_inverted_index({1: "", 2: " hello, world! "})
+
+    assert postings_as_lists(result.data_) == {'hello': [2], 'world': [2]}, (
+        f"result.data_ must contain only real words\nGot: {result.data_}\n"
+    )
+
+def test_build_inverted_index_repeated_words():
+    """Test build adds document once for word repeated in it"""
+
+    result = build_inverted_index({1: "text line text", 2: "text text"})
+
+    assert postings_as_lists(result.data_) == {'text': [1, 2], 'line': [1]}, (
+        f"result.data_ must not contain repeated documents\nGot: {result.data_}\n"
+    )
+
 # InvertedIndex.__init__ test
 
+def test_init_keeps_postings_dict(sample_index):
+    """Test InvertedIndex init stores PostingsDict without copying it"""
+
+    result = InvertedIndex(sample_index.data_, validate=False)
+
+    assert result.data_ is sample_index.data_
+
 def test_init_type_error():
     """Test InvertedIndex init with wrong type input"""
 
@@ -207,20 +234,19 @@ def test_dump_invalid_path_name():
     with pytest.raises(FileNotFoundError):
         inverted_index.dump(file_path)
 
-def test_dump_valid_data_to_json(tmp_path):
+def test_dump_valid_data_to_json():
     """Test dump to json with valid data"""
 
-    file_path = tmp_path / "inverted.index"
+    buffer = BytesIO()
     valid_dict = {
         'a': [1],
         'b': [2, 3]
     }
     valid_dict = defaultdict(list, valid_dict)
     inverted_index = InvertedIndex(valid_dict)
-    inverted_index.dump(file_path)
+    inverted_index.dump(buffer)
 
-    with open(file_path, 'r') as file:
-        dumped_data = json.load(file)
+    dumped_data = json.loads(buffer.getvalue())
 
     assert dumped_data == valid_dict, (
         f"Valid data: {valid_dict}\nGot: {dumped_data}\n"
@@ -247,55 +273,41 @@ def test_load_read_invalid_json(tmp_path):
     with pytest.raises(ValueError):
         InvertedIndex.load(file_path)
 
-def test_load_read_empty_dict(tmp_path):
+def test_load_read_empty_dict():
     """Test load with empy json"""
 
-    empty_dict_path = tmp_path / "empty_dict.json"
-    empty_dict_path.touch()
-    with open(empty_dict_path, 'w') as file:
-        json.dump({}, file)
-
-    result = InvertedIndex.load(empty_dict_path)
+    result = InvertedIndex.load(BytesIO(json.dumps({}).encode()))
 
     assert len(result.data_) == 0, (
         f"result must be empty dict. Got: {result.data_}\n"
     )
 
-def test_load_read_invalid_dict_from_json(tmp_path):
+def test_load_read_invalid_dict_from_json():
     """Test load with invalid data from json"""
 
-    invalid_data_path = tmp_path / "invalid_dict.json"
-    invalid_data_path.touch()
     invalid_dict = {
         'a': ['a', 'b', 'c'],
         'b': None
     }
 
-    with open(invalid_data_path, 'w') as file:
-        json.dump(invalid_dict, file)
-
     with pytest.raises(Exception):
-        InvertedIndex.load(invalid_data_path)
+        InvertedIndex.load(BytesIO(json.dumps(invalid_dict).encode()))
 
-def test_load_result_type_from_json(tmp_path):
+def test_load_result_type_from_json():
     """Test load function output from json"""
 
-    valid_data_path = tmp_path / "valid_dict.json"
     valid_data = {
         'a': [1, 2, 3],
         'abc': [5, 1, 19]
     }
     valid_data = defaultdict(list, valid_data)
 
-    with open(valid_data_path, 'w') as file:
-        json.dump(valid_data, file)
-
-    result = InvertedIndex.load(valid_data_path)
+    result = InvertedIndex.load(BytesIO(json.dumps(valid_data).encode()))
 
     assert isinstance(result, InvertedIndex), (
         f"Result must be type of InvertedIndex\nGot: {type(result)}\n"
     )
-    assert valid_data == result.data_, (
+    assert valid_data == postings_as_lists(result.data_), (
         f"Result.data_ must be: {valid_data}\nGot: {result.data_}"
     )
 
@@ -334,50 +346,117 @@ def test_query_valid_input():
     }
     inverted_index = InvertedIndex(valid_data)
 
-    assert  len(set(inverted_index.query([]))) == 0
-    assert len(set([1, 2, 3]).symmetric_difference(inverted_index.query(['a']))) == 0
-    assert len(set([1, 2]).symmetric_difference(inverted_index.query(['a', 'abc']))) == 0
-    assert len(set([2, 3]).symmetric_difference(inverted_index.query(['a', 'c']))) == 0
-    assert len(set([2]).symmetric_difference(inverted_index.query(['abc', 'c', 'a']))) == 0
+    assert_same_ids(inverted_index.query([]), [])
+    assert_same_ids(inverted_index.query(['a']), [1, 2, 3])
+    assert_same_ids(inverted_index.query(['a', 'abc']), [1, 2])
+    assert_same_ids(inverted_index.query(['a', 'c']), [2, 3])
+    assert_same_ids(inverted_index.query(['abc', 'c', 'a']), [2])
+
+def test_query_repeated():
+    """Test repeated query is served from cache and isn't affected by result changes"""
+
+    inverted_index = InvertedIndex({'a': [1, 2, 3], 'c': [2, 6, 3]})
+
+    document_ids = inverted_index.query(['a', 'c'])
+    document_ids.append(100)
+
+    assert set(inverted_index.query(['C ', 'a', 'c'])) == {2, 3}
+    assert inverted_index._cached_query.cache_info().hits == 1
+
+def test_query_after_index_change():
+    """Test cached query results are not reused after index data changes"""
+
+    inverted_index = InvertedIndex({'a': [1, 2, 3], 'c': [2, 6, 3]})
+
+    assert set(inverted_index.query(['a', 'c'])) == {2, 3}
+
+    inverted_index.data_['c'] = [2, 6, 3, 1]
+    assert set(inverted_index.query(['a', 'c'])) == {1, 2, 3}
+
+    inverted_index.data_['c'] = [6, 7, 8, 9]
+    assert inverted_index.query(['a', 'c']) == []
+
+def test_query_after_postings_change_in_place():
+    """Test cached query results are not reused after postings change in place"""
+
+    inverted_index = InvertedIndex({'a': [1, 2, 3], 'c': [2, 6, 3]})
+
+    assert set(inverted_index.query(['a', 'c'])) == {2, 3}
+
+    inverted_index.data_['c'][0] = 1
+    assert set(inverted_index.query(['a', 'c'])) == {1, 3}
+
+    inverted_index.data_['c'].pop()
+    inverted_index.data_['c'].append(2)
+    assert set(inverted_index.query(['a', 'c'])) == {1, 2}
+
+    inverted_index.data_['c'] = [2]
+    inverted_index.query(['a', 'c'])
+    inverted_index.data_['c'].append(3)
+    assert set(inverted_index.query(['a', 'c'])) == {2, 3}
+
+def test_query_after_copy_change(sample_index, sample_index_copy):
+    """Test postings of copied index track their changes too"""
+
+    word = next(iter(sample_index.data_))
+    documents = sample_index_copy.query([word])
+    sample_index_copy.data_[word].append(max(documents) + 1)
+
+    assert sample_index_copy.query([word]) == documents + [max(documents) + 1]
+    assert sample_index.query([word]) == documents
+
+def test_postings_order_checked_once_per_change():
+    """Test postings order is recorded by build and rechecked after change"""
+
+    postings = build_inverted_index({1: "text", 2: "text"}).data_['text']
+
+    assert postings._sorted_version == postings.version and postings.is_sorted()
+
+    postings.append(0)
+    assert not postings.is_sorted()
+
+    postings[-1] = 3
+    assert postings.is_sorted()
+
+def test_query_unknown_word():
+    """Test query with unknown word returns nothing and doesn't change index"""
+
+    inverted_index = InvertedIndex({'a': [1, 2, 3], 'c': [2, 6, 3]})
+
+    assert inverted_index.query(['a', 'zzz', 'c']) == []
+    assert 'zzz' not in inverted_index.data_
+
+def test_query_unsorted_postings():
+    """Test query intersects unsorted postings with repeated documents"""
+
+    inverted_index = InvertedIndex({'a': [3, 1, 2, 1], 'abc': [5, 1, 2], 'c': [6, 2, 3, 2]})
+
+    assert inverted_index.query(['a', 'abc']) == [1, 2]
+    assert inverted_index.query(['abc', 'c', 'a']) == [2]
 
 # tests
 
-def test_full():
+@pytest.mark.xdist_group("io")
+def test_full(sample_index):
     """Full test"""
 
-    filename = SAMPLE_DATASET_PATH
     dump_name = JSON_INVERTED_INDEX
-    documents = load_documents(filename)
-    inverted_index = build_inverted_index(documents)
-    inverted_index.dump(dump_name)
+    sample_index.dump(dump_name)
     inverted_index = InvertedIndex.load(dump_name)
     document_ids = inverted_index.query(["two", "words"])
-    result = set()
-    assert len(result.symmetric_difference(set(document_ids))) == 0, (
-        "full test 1 failed\n"
-    )
+    assert_same_ids(document_ids, [], "full test 1 failed\n")
     document_ids = inverted_index.query(["text", "line"])
-    result = set([5, 7])
-    assert len(result.symmetric_difference(document_ids)) == 0, (
-        "full test 2 failed\n"
-    )
+    assert_same_ids(document_ids, [5, 7], "full test 2 failed\n")
     document_ids = inverted_index.query(["something", "else"])
-    result = set([78])
-    assert len(result.symmetric_difference(document_ids)) == 0, (
-        "full test 3 failed\n"
-    )
+    assert_same_ids(document_ids, [78], "full test 3 failed\n")
     document_ids = inverted_index.query(["something", "ggvp"])
-    result = set([])
-    assert len(result.symmetric_difference(document_ids)) == 0, (
-        "full test 4 failed\n"
-    )
+    assert_same_ids(document_ids, [], "full test 4 failed\n")
 
-def test_compare_objects():
+def test_compare_objects(sample_index, sample_index_copy):
     """Tests for InvertedIndex.__eq__() and InvertedIndex.__ne__()"""
 
-    filename = "sample.txt"
-    inverted_index_1 = build_inverted_index(load_documents(filename))
-    inverted_index_2 = build_inverted_index(load_documents(filename))
+    inverted_index_1 = sample_index
+    inverted_index_2 = sample_index_copy
 
     with pytest.raises(NotImplementedError):
         assert inverted_index_1 != {}, (
@@ -418,13 +497,12 @@ def test_compare_objects():
             {inverted_index_2}\n"
     )
 
-def test_eq_for_inverted_index_objects(tmp_path):
+def test_eq_for_inverted_index_objects(tmp_path, sample_index):
     """Test for loading from dump"""
 
-    filename = "sample.txt"
     dump_filename = tmp_path / "dump.index"
 
-    inverted_index = build_inverted_index(load_documents(filename))
+    inverted_index = sample_index
     inverted_index.dump(dump_filename)
     inverted_index_after_load = InvertedIndex.load(dump_filename)
 
@@ -436,10 +514,9 @@ def test_eq_for_inverted_index_objects(tmp_path):
                         - after load: {inverted_index_after_load}\n"
     )
 
-def test_repr_and_str():
+def test_repr_and_str(sample_index):
     """Test for InvertedIndex.__repr__() and InvertedIndex.__str__()"""
-    filename = "sample.txt"
-    inverted_index = build_inverted_index(load_documents(filename))
+    inverted_index = sample_index
 
     assert isinstance(str(inverted_index), str), (
         f"InvertedIndex.__str__() must be type of {type(str)}\n\
@@ -451,6 +528,13 @@ def test_repr_and_str():
             Got: {type(inverted_index.__repr__())}"
     )
 
+def test_repr_prints_only_mapping():
+    """Test InvertedIndex repr doesn't depend on memory addresses"""
+
+    inverted_index = InvertedIndex({'a': [1, 2]})
+
+    assert repr(inverted_index) == "InvertedIndex: {'a': Postings('q', [1, 2])}"
+
 # StoragePolicy & JsonPolicy tests
 
 def test_storage_policy_has_dump_and_load_methods():
@@ -463,63 +547,76 @@ def test_storage_policy_has_dump_and_load_methods():
     StoragePolicy.dump(test_mapping_dict, "some_path")
     StoragePolicy.load("some_path")
 
-def test_json_policy_dump(tmp_path):
+def test_json_policy_dump():
     """Test dump to json with valid data"""
 
-    file_path = tmp_path / "inverted.index"
+    buffer = BytesIO()
     valid_dict = {
         'a': [1],
         'b': [2, 3]
     }
     valid_dict = defaultdict(list, valid_dict)
-    JsonPolicy.dump(valid_dict, file_path)
+    JsonPolicy.dump(valid_dict, buffer)
 
-    with open(file_path, 'r') as file:
-        dumped_data = json.load(file)
+    dumped_data = json.loads(buffer.getvalue())
 
     assert dumped_data == valid_dict, (
         f"Valid data: {valid_dict}\nGot: {dumped_data}\n"
     )
 
-def test_json_policy_load(tmp_path):
+def test_json_policy_load():
     """Test load from json with valid data"""
 
-    file_path = tmp_path / "inverted.index"
     valid_dict = {
         'a': [1],
         'b': [2, 3]
     }
     valid_dict = defaultdict(list, valid_dict)
 
-    with open(file_path, 'w') as file:
-        json.dump(valid_dict, file)
-
-    inverted_index = JsonPolicy.load(file_path)
+    inverted_index = JsonPolicy.load(BytesIO(json.dumps(valid_dict).encode()))
 
-    assert inverted_index.data_ == valid_dict, (
+    assert postings_as_lists(inverted_index.data_) == valid_dict, (
         f"Valid data: {valid_dict}\nGot: {inverted_index}\n"
     )
 
 # Arguments parsing tests
 
-@pytest.mark.parametrize(
-    "dataset_path",
-    [
-        SMALL_DATASET_PATH,
-        TINY_DATASET_PATH,
-    ],
-)
-def test_dump_to_struct_and_load_from_struct(tmp_path, dataset_path):
+@pytest.fixture(scope="module", params=[SMALL_DATASET_PATH, TINY_DATASET_PATH])
+def dataset_index(request):
+    """Inverted index of every test dataset, built once per module (don't change it)"""
+
+    return build_inverted_index(load_documents(request.param))
+
+def test_dump_to_struct_and_load_from_struct(tmp_path, dataset_index):
     """Test dump in binary format"""
 
     dump_path_name = tmp_path / "inverted.index"
-    documents = load_documents(dataset_path)
-    inverted_index = build_inverted_index(documents)
+    inverted_index = dataset_index
     inverted_index.dump(dump_path_name, method='struct')
     loaded_inverted_index = InvertedIndex.load(dump_path_name, method='struct')
 
     assert inverted_index == loaded_inverted_index
 
+def test_load_from_struct_unknown_format(tmp_path):
+    """Test load of binary data without format magic"""
+
+    invalid_path = tmp_path / "invalid.index"
+    invalid_path.write_bytes(b"\x00\x00\x00\x01\x00\x01a\x00\x01\x00\x00\x00\x01")
+
+    with pytest.raises(ValueError):
+        InvertedIndex.load(invalid_path, method='struct')
+
+def test_lazy_load_from_struct():
+    """Test lazy load decodes postings on demand and matches eager load"""
+
+    inverted_index = InvertedIndex.load(STRUCT_INDEX_PATH, method='struct')
+    lazy_inverted_index = InvertedIndex.load(STRUCT_INDEX_PATH, method='struct', lazy=True)
+
+    assert lazy_inverted_index.data_._postings == {}
+    assert lazy_inverted_index.query(['text']) == inverted_index.query(['text'])
+    assert list(lazy_inverted_index.data_._postings) == ['text']
+    assert lazy_inverted_index == inverted_index
+
 @pytest.mark.parametrize(
     "namespace",
     [
@@ -1,5 +1,4 @@
 from unittest.mock import patch
-import pytest
 from asset_with_external_dependency import Asset
 
 
@@ -22,6 +21,7 @@ def test_can_mock_external_calls(mock_get_usd_course):
 
         expected_revenue = (76.32 + 0.1 * iteration) * asset_property.capital * asset_property.interest
         calculated_revenue = asset_property.calculate_revenue_from_usd(years=1)
-        assert calculated_revenue == pytest.approx(expected_revenue, abs=0.01), (
+        # compare in integer cents
+        assert round(calculated_revenue * 100) == round(expected_revenue * 100), (
             f"incorrect calculated revenue at iteration {iteration}"
         )
\ No newline at end of file
@@ -1,13 +1,13 @@
-from unittest.mock import patch
+from sleepy import sleep_add, sleep_multiply
 
-from sleepy import sleep_add, sleep_multiply, sleep
 
-
-@patch("time.sleep")
-@patch("sleepy.sleep")
-def test_sleep_mock(mock_sleep, mock_time_sleep):
+def test_sleep_mock(monkeypatch):
     '''Test mock sleep and time.sleep'''
+    sleep_calls = []
+    time_sleep_calls = []
+    monkeypatch.setattr("sleepy.sleep", sleep_calls.append)
+    monkeypatch.setattr("time.sleep", time_sleep_calls.append)
     sleep_add(1, 2)
     sleep_multiply(1, 2)
-    mock_sleep.assert_called_with(3)
-    mock_time_sleep.assert_called_with(5)
\ No newline at end of file
+    assert sleep_calls == [3]
+    assert time_sleep_calls == [5]
@@ -1,6 +1,14 @@
 # see: https://docs.pytest.org/en/latest/example/simple.html#control-skipping-of-tests-according-to-command-line-option
+from pathlib import Path
+
 import pytest
 
+from task_Ashabokov_Aslan_web_spy import count_feature_links
+
+
+HTML_DUMP_FILEPATH = 'gitlab_features.html'
+EXPECTED_HTML_DUMP = 'gitlab_features_expected.html'
+
 
 def pytest_addoption(parser):
     parser.addoption(
@@ -14,6 +22,7 @@ def pytest_addoption(parser):
 def pytest_configure(config):
     config.addinivalue_line("markers", "slow: mark test as slow to run")
     config.addinivalue_line("markers", "integration_test: mark test as integration test")
+    config.addinivalue_line("markers", "xdist_group(name): run tests of group on one xdist worker")
 
 
 def pytest_collection_modifyitems(config, items):
@@ -27,3 +36,21 @@ def pytest_collection_modifyitems(config, items):
         for item in items:
             if "integration_test" in item.keywords:
                 item.add_marker(skip_slow)
+
+
+@pytest.fixture(scope="session")
+def gitlab_html_dump() -> bytes:
+    """GitLab features page dump, read once per session"""
+    return Path(HTML_DUMP_FILEPATH).read_bytes()
+
+
+@pytest.fixture(scope="session")
+def expected_html_dump() -> bytes:
+    """Expected GitLab features page dump, read once per session"""
+    return Path(EXPECTED_HTML_DUMP).read_bytes()
+
+
+@pytest.fixture(scope="session")
+def expected_html_counts(expected_html_dump) -> tuple:
+    """Free and non free features counts of expected dump, parsed once per session"""
+    return count_feature_links((expected_html_dump,))
@@ -6,10 +6,13 @@ Loads HTML and compares with HTML local dump
 '''
 
 import sys
+import functools
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter, Namespace
+from typing import Iterable, Iterator
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from lxml import etree
 
 
 FREE_SEARCH_FILTER = {"title": "Available in GitLab SaaS Free"}
@@ -17,22 +20,60 @@ NONFREE_SEARCH_FILTER = {"title": "Not available in SaaS Free"}
 
 
 URL = 'https://about.gitlab.com/features/'
-BS_PARSER = 'html.parser'
+HTML_CHUNK_SIZE = 64 * 1024
+HTTP_TIMEOUT = 10
+
+# one session for all requests keeps connections (and TLS sessions) alive
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10))
+
+
+class FeatureLinksCounter:
+    '''lxml parser target, which counts free and non free feature links'''
+
+    def __init__(self):
+        self.free_count = 0
+        self.non_free_count = 0
+
+    def start(self, tag: str, attrib: dict):
+        '''Count <a> element by its title'''
+        if tag != 'a':
+            return
+
+        title = attrib.get('title')
+
+        if title == FREE_SEARCH_FILTER['title']:
+            self.free_count += 1
+        elif title == NONFREE_SEARCH_FILTER['title']:
+            self.non_free_count += 1
+
+    def close(self) -> tuple:
+        '''Return free and non free links count'''
+        return self.free_count, self.non_free_count
 
 
 def get_html(url: str) -> str:
     '''Loads html from WEB'''
-    response = requests.get(url)
+    response = _SESSION.get(url, timeout=HTTP_TIMEOUT)
     return response.text
 
+def iter_html(url: str) -> Iterator[bytes]:
+    '''Loads html from WEB by chunks'''
+    with _SESSION.get(url, stream=True, timeout=HTTP_TIMEOUT) as response:
+        yield from response.iter_content(HTML_CHUNK_SIZE)
+
+def count_feature_links(html_chunks: Iterable[bytes]) -> tuple:
+    '''Get free and non free elements count from HTML chunks'''
+    parser = etree.HTMLParser(target=FeatureLinksCounter())
+
+    for chunk in html_chunks:
+        parser.feed(chunk)
+
+    return parser.close()
+
 def parse_html(url: str) -> tuple:
     '''Parse HTML and get free and non free elements count'''
-    row_html = get_html(url)
-    soup = BeautifulSoup(row_html, BS_PARSER)
-    free_count = len(soup.find_all("a", FREE_SEARCH_FILTER))
-    non_free_count = len(soup.find_all("a", NONFREE_SEARCH_FILTER))
-
-    return free_count, non_free_count
+    return count_feature_links(iter_html(url))
 
 
 def gitlab_parser_callback(args: Namespace):
@@ -41,8 +82,9 @@ def gitlab_parser_callback(args: Namespace):
     print(f"free products: {free_count}", file=sys.stdout)
     print(f"enterprise products: {non_free_count}", file=sys.stdout)
 
+@functools.lru_cache(maxsize=1)
 def setup_parser():
-    '''Setup parser'''
+    '''Setup parser (built once, parse_args doesn't change it)'''
     parser = ArgumentParser(
         prog='WebSpy',
         description='GitLab web spy',
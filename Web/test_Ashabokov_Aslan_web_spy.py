@@ -7,13 +7,12 @@ from argparse import Namespace, ArgumentParser
 
 import pytest
 
-from task_Ashabokov_Aslan_web_spy import main, get_html, \
-    parse_html, setup_parser, gitlab_parser_callback
+from task_Ashabokov_Aslan_web_spy import main, get_html, iter_html, \
+    parse_html, setup_parser, gitlab_parser_callback, HTTP_TIMEOUT
+from conftest import HTML_DUMP_FILEPATH
 
 
 GITLAB_URL = 'https://about.gitlab.com/features/'
-HTML_DUMP_FILEPATH = 'gitlab_features.html'
-EXPECTED_HTML_DUMP = 'gitlab_features_expected.html'
 FREE_IN_TEST_FILE = 351
 NON_FREE_IN_TEST_FILE = 218
 
@@ -25,10 +24,10 @@ def test_setup_parser():
     assert isinstance(parser, ArgumentParser)
 
 @pytest.mark.slow
-@mock.patch("task_Ashabokov_Aslan_web_spy.get_html")
+@mock.patch("task_Ashabokov_Aslan_web_spy.iter_html")
 @mock.patch("task_Ashabokov_Aslan_web_spy.print")
 @mock.patch("task_Ashabokov_Aslan_web_spy.ArgumentParser.parse_args")
-def test_main(mock_parse_args, mock_print, mock_get_html):
+def test_main(mock_parse_args, mock_print, mock_iter_html, gitlab_html_dump):
     '''Test main function'''
     mock_parse_args.return_value = Namespace(
         command='gitlab',
@@ -36,19 +35,15 @@ def test_main(mock_parse_args, mock_print, mock_get_html):
         callback=gitlab_parser_callback,
     )
     mock_print.return_value = None
-    with open(HTML_DUMP_FILEPATH, 'r') as fin:
-        html_dump = fin.read()
-    mock_get_html.return_value = html_dump
+    mock_iter_html.return_value = [gitlab_html_dump]
     main()
 
 @pytest.mark.slow
-@mock.patch("requests.get")
-def test_get_html_local(mock_get):
+@mock.patch("task_Ashabokov_Aslan_web_spy._SESSION.get")
+def test_get_html_local(mock_get, gitlab_html_dump):
     '''Test get_html function locally'''
 
-    with open(HTML_DUMP_FILEPATH, 'r') as fin:
-        html_dump = fin.read()
-
+    html_dump = gitlab_html_dump.decode()
     mock_get.return_value = Namespace(text=html_dump)
     get_html_result = get_html(GITLAB_URL)
 
@@ -56,14 +51,26 @@ def test_get_html_local(mock_get):
             (f'get_html response should match to {HTML_DUMP_FILEPATH} file')
 
 @pytest.mark.slow
-@mock.patch('task_Ashabokov_Aslan_web_spy.get_html')
-def test_parse_html_local(mock_get_html):
-    '''Test html parsing'''
+@mock.patch("task_Ashabokov_Aslan_web_spy._SESSION.get")
+def test_iter_html_local(mock_get, gitlab_html_dump):
+    '''Test iter_html function locally'''
+
+    mock_get.return_value.__enter__.return_value.iter_content.return_value = [gitlab_html_dump]
+    iter_html_result = b''.join(iter_html(GITLAB_URL))
+
+    mock_get.assert_called_once_with(GITLAB_URL, stream=True, timeout=HTTP_TIMEOUT)
+    assert gitlab_html_dump == iter_html_result, \
+            (f'iter_html response should match to {HTML_DUMP_FILEPATH} file')
 
-    with open(HTML_DUMP_FILEPATH, 'r') as fin:
-        html_dump = fin.read()
+@pytest.mark.slow
+@mock.patch('task_Ashabokov_Aslan_web_spy.iter_html')
+def test_parse_html_local(mock_iter_html, gitlab_html_dump):
+    '''Test html parsing'''
 
-    mock_get_html.return_value = html_dump
+    # split dump into chunks to check parsing across chunk bounds
+    mock_iter_html.return_value = [
+        gitlab_html_dump[i:i + 1000] for i in range(0, len(gitlab_html_dump), 1000)
+    ]
     free_count, non_free_count = parse_html(GITLAB_URL)
 
     assert FREE_IN_TEST_FILE == free_count, \
@@ -72,16 +79,11 @@ def test_parse_html_local(mock_get_html):
         (f'True non FREE count: {NON_FREE_IN_TEST_FILE}. Got: {non_free_count}.')
 
 @pytest.mark.integration_test
-def test_compare_dump_html_and_web_html():
+@pytest.mark.xdist_group("io")
+def test_compare_dump_html_and_web_html(expected_html_counts):
     '''Compare if web html coresponds to data from dump'''
 
-    with open(EXPECTED_HTML_DUMP, 'r') as fin:
-        html_dump = fin.read()
-
-    with mock.patch("task_Ashabokov_Aslan_web_spy.get_html") as mock_get_html:
-        mock_get_html.return_value = html_dump
-        true_free_count, true_non_free_count = parse_html(GITLAB_URL)
-
+    true_free_count, true_non_free_count = expected_html_counts
     loaded_free_count, loaded_non_free_count = parse_html(GITLAB_URL)
 
     assert true_free_count == loaded_free_count and \